@@ -9,140 +9,172 @@ Funding actual por token (bases tomadas de Lighter) para:
 Salida: pivote con columnas Hyperliquid/hr | Lighter/hr | Paradex/hr
 """
 
+import os
+import re
 import sys
-import time
 import math
+import time
+import atexit
+import asyncio
 import argparse
+import importlib
+import importlib.machinery
+import importlib.util
 from collections import Counter
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from types import ModuleType
 
 import httpx
+import orjson
+import ciso8601
+import ijson
+import numpy as np
+
+# parser del agregador: módulo aparte, compilable con mypyc (ver README)
+def _load_core() -> ModuleType:
+    """
+    funding_core junto a este fichero, sin tocar sys.path: import relativo si se importa
+    como paquete (`import scripts.funding`); si no (script o carga por ruta), se busca sólo
+    en este directorio. En ambos casos el .so de mypyc tiene prioridad sobre el .py.
+    """
+    if __package__:
+        return importlib.import_module(f"{__package__}.funding_core")
+    if "funding_core" in sys.modules:
+        return sys.modules["funding_core"]
+    spec = importlib.machinery.PathFinder.find_spec("funding_core", [str(Path(__file__).resolve().parent)])
+    if spec is None or spec.loader is None:
+        raise ImportError("funding_core no encontrado junto a funding.py")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules["funding_core"] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+_core = _load_core()
+extract_record = _core.extract_record
+is_probable_rate_key = _core.is_probable_rate_key
+is_probable_symbol_key = _core.is_probable_symbol_key
+traverse = _core.traverse
 
 API_AGG = "https://mainnet.zklighter.elliot.ai/api/v1/funding-rates"
+AGG_ITEMS_PREFIX = "funding_rates.item"  # esquema de Lighter: {"funding_rates": [{...}, ...]}
 PARADEX_URL = "https://api.prod.paradex.trade/v1/funding/data?market={market}"
+USER_AGENT = "funding-triplet/1.1"
+CACHE_DIR = Path.home() / ".cache" / "funding"
+CACHE_TTL_S = 300  # el agregador cambia cada hora; 5 min evita re-descargas en ejecuciones seguidas
+
+def make_client() -> httpx.AsyncClient:
+    """Cliente único (HTTP/2 + keep-alive largo) compartido por agregador y Paradex."""
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=12,
+        headers={"User-Agent": USER_AGENT},
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=30.0),
+    )
+
+# Cliente y event loop a nivel de módulo: si el script se importa (p.ej. desde un
+# dashboard) y se llama a main() varias veces, se reutiliza el pool y la sesión TLS.
+# Las conexiones de un AsyncClient quedan ligadas a su loop, por eso el loop también persiste.
+_CLIENT: Optional[httpx.AsyncClient] = None
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+def get_client() -> httpx.AsyncClient:
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = make_client()
+    return _CLIENT
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    if _LOOP is None or _LOOP.is_closed():
+        _LOOP = asyncio.new_event_loop()
+    return _LOOP
+
+@atexit.register
+def _close_shared() -> None:
+    if _LOOP is None or _LOOP.is_closed():
+        return
+    if _CLIENT is not None and not _CLIENT.is_closed:
+        _LOOP.run_until_complete(_CLIENT.aclose())
+    _LOOP.close()
 
 # ---------------- util comunes ----------------
-def clean_alnum(s: str) -> str:
-    return "".join(ch for ch in s if ch.isalnum()).lower()
-
 def pct(x: Optional[float]) -> str:
     if x is None or math.isnan(x):
         return "—"
     return f"{x*100:.4f}%"
 
-def coerce_rate(val: Any) -> Optional[float]:
-    """Normaliza a fracción por hora. Si viene en % (1..100) => /100. Descarta >50%/h."""
-    if val is None:
+# ---------------- caché en disco (bytes crudos, caducidad por mtime) ----------------
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+def _cache_path(name: str) -> Path:
+    return CACHE_DIR / (_UNSAFE_NAME.sub("_", name) + ".json")
+
+def cache_read(name: str, ttl: float) -> Optional[bytes]:
+    """Bytes cacheados si existen y tienen menos de `ttl` segundos; ttl<=0 desactiva."""
+    if ttl <= 0:
         return None
+    path = _cache_path(name)
     try:
-        x = float(val)
-    except Exception:
-        return None
-    if 1.0 < abs(x) <= 100.0:
-        x /= 100.0
-    if abs(x) > 0.5:
-        return None
-    return x
-
-def base_from_symbol(symbol: str) -> str:
-    s = (symbol or "").upper().replace("/", "-").replace("__", "-").strip()
-    parts = [p for p in s.split("-") if p]
-    return parts[0] if parts else (s or "?")
-
-# ---------------- agregador (parser robusto) ----------------
-PLAT_MAP = {
-    "lighter": "Lighter",
-    "zklighter": "Lighter",
-    "hyperliquid": "Hyperliquid",
-    "hyperliquidv2": "Hyperliquid",
-    "hyper": "Hyperliquid",
-}
-PLATFORM_KEYS = ("platform", "exchange", "venue", "source", "provider", "dex", "market_provider")
-SYMBOL_KEYS = ("symbol", "market", "pair", "name", "base", "asset", "coin", "ticker")
-FUND_KEYS = ("funding_rate", "fundingrate", "hourlyfundingrate", "predictedfundingrate", "rate", "value")
-
-def norm_platform_label(raw: Optional[str]) -> Optional[str]:
-    if not raw:
+        if time.time() - path.stat().st_mtime >= ttl:
+            return None
+        return path.read_bytes()
+    except OSError:
         return None
-    key = clean_alnum(raw)
-    if key in PLAT_MAP:
-        return PLAT_MAP[key]
-    for k, v in PLAT_MAP.items():
-        if k in key:
-            return v
-    return None
-
-def is_probable_symbol_key(k: str) -> bool:
-    return any(x in k.lower() for x in SYMBOL_KEYS)
-
-def is_probable_platform_key(k: str) -> bool:
-    return any(x in k.lower() for x in PLATFORM_KEYS)
-
-def is_probable_rate_key(k: str) -> bool:
-    k = k.lower()
-    return any(x in k for x in FUND_KEYS) or ("fund" in k and "index" not in k and "time" not in k)
-
-def traverse(node: Any, path_keys: Tuple[str, ...]) -> Iterable[Tuple[Dict[str, Any], Tuple[str, ...]]]:
-    if isinstance(node, dict):
-        yield node, path_keys
-        for k, v in node.items():
-            yield from traverse(v, path_keys + (str(k),))
-    elif isinstance(node, list):
-        for idx, v in enumerate(node):
-            yield from traverse(v, path_keys + (str(idx),))
-
-def extract_record(d: Dict[str, Any], path_keys: Tuple[str, ...]) -> Tuple[Optional[str], Optional[str], Optional[float]]:
-    """(platform, base, rate) desde cualquier sub-dict del agregador."""
-    platform = None
-    symbol = None
-    rate = None
-
-    # 1) directos
-    for k, v in d.items():
-        if isinstance(v, str):
-            if is_probable_platform_key(k) and not platform:
-                platform = norm_platform_label(v)
-            if is_probable_symbol_key(k) and not symbol:
-                symbol = v
-        if isinstance(v, (int, float, str)) and is_probable_rate_key(k) and rate is None:
-            rate = coerce_rate(v)
-
-    # 2) plataforma por ruta (p.ej. claves superiores "Hyperliquid" / "Lighter")
-    if not platform:
-        for key in path_keys[::-1]:
-            guess = norm_platform_label(key)
-            if guess:
-                platform = guess
-                break
 
-    # 3) símbolo anidado
-    if not symbol:
-        for v in d.values():
-            if isinstance(v, dict):
-                for kk, vv in v.items():
-                    if isinstance(vv, str) and is_probable_symbol_key(kk):
-                        symbol = vv
-                        break
-            if symbol:
-                break
-
-    # 4) rate anidado
-    if rate is None:
-        for v in d.values():
-            if isinstance(v, dict):
-                for kk, vv in v.items():
-                    if is_probable_rate_key(kk) and isinstance(vv, (int, float, str)):
-                        rate = coerce_rate(vv)
-                        if rate is not None:
-                            break
-            if rate is not None:
-                break
-
-    base = base_from_symbol(symbol or "")
-    return platform, base if symbol else None, rate
+def cache_write(name: str, content: bytes) -> None:
+    """Escritura atómica (tmp + rename); un fallo de disco nunca rompe la ejecución."""
+    path = _cache_path(name)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+    except OSError:
+        pass
 
-def fetch_agg(agg_debug: bool=False) -> Tuple[Dict[str, Dict[str, float]], List[str]]:
+async def iter_agg_roots(client: httpx.AsyncClient, cache_ttl: float=0.0) -> AsyncIterator[Any]:
+    """
+    Sub-árboles del agregador a recorrer: cada registro bajo AGG_ITEMS_PREFIX según
+    llega por la red (ijson), sin construir el documento completo. Si el prefijo no
+    aparece (esquema desconocido) entrega el documento entero parseado con orjson.
+    """
+    content = cache_read("agg", cache_ttl)
+    if content is not None:
+        found = False
+        for item in ijson.items(content, AGG_ITEMS_PREFIX, use_float=True):
+            found = True
+            yield item
+        if not found:
+            yield orjson.loads(content)
+        return
+
+    raw = bytearray()  # bytes crudos para caché / fallback (mucho menores que el grafo de objetos)
+    items = ijson.sendable_list()
+    coro = ijson.items_coro(items, AGG_ITEMS_PREFIX, use_float=True)
+    found = False
+    async with client.stream("GET", API_AGG) as r:
+        r.raise_for_status()
+        async for chunk in r.aiter_bytes():
+            raw += chunk
+            coro.send(chunk)
+            found = found or bool(items)
+            for item in items:
+                yield item
+            del items[:]
+    coro.close()
+    found = found or bool(items)
+    for item in items:
+        yield item
+
+    if cache_ttl > 0:
+        cache_write("agg", bytes(raw))
+    if not found:
+        yield orjson.loads(raw)
+
+async def fetch_agg(client: httpx.AsyncClient, agg_debug: bool=False, cache_ttl: float=0.0) -> Tuple[Dict[str, Dict[str, float]], List[str]]:
     """
     Devuelve:
       - by_base: { BASE: { 'Lighter': rate?, 'Hyperliquid': rate? } }
@@ -151,55 +183,49 @@ def fetch_agg(agg_debug: bool=False) -> Tuple[Dict[str, Dict[str, float]], List[
     by_base: Dict[str, Dict[str, float]] = {}
     bases_lighter: List[str] = []
     seen_platforms = Counter()
-    debug_samples: List[Tuple[Dict[str, Any], Tuple[str, ...]]] = []
-
-    with httpx.Client(timeout=12, headers={"User-Agent": "funding-triplet/1.1"}) as client:
-        r = client.get(API_AGG)
-        r.raise_for_status()
-        data = r.json()
-
-    for node, path in traverse(data, ()):
-        if not isinstance(node, dict):
-            continue
-        plat, base, rate = extract_record(node, path)
-        if plat:
-            seen_platforms[plat] += 1
-        if plat not in ("Lighter", "Hyperliquid") or not base or rate is None:
-            # guarda candidatos de debug
-            if agg_debug and len(debug_samples) < 10:
-                has_sym = any(is_probable_symbol_key(k) for k in node.keys())
-                has_rate = any(is_probable_rate_key(k) for k in node.keys())
-                if has_sym or has_rate:
-                    debug_samples.append((node, path))
-            continue
+    debug_samples: List[Tuple[Dict[str, Any], Optional[str]]] = []
+
+    async for root in iter_agg_roots(client, cache_ttl=cache_ttl):
+        for node, plat_hint in traverse(root):
+            plat, base, rate = extract_record(node, plat_hint)
+            if plat:
+                seen_platforms[plat] += 1
+            if plat not in ("Lighter", "Hyperliquid") or not base or rate is None:
+                # guarda candidatos de debug
+                if agg_debug and len(debug_samples) < 10:
+                    keys_low = [k.lower() for k in node.keys()]
+                    has_sym = any(is_probable_symbol_key(k) for k in keys_low)
+                    has_rate = any(is_probable_rate_key(k) for k in keys_low)
+                    if has_sym or has_rate:
+                        debug_samples.append((node, plat_hint))
+                continue
 
-        by_base.setdefault(base, {})
-        by_base[base][plat] = rate
-        if plat == "Lighter" and base not in bases_lighter:
-            bases_lighter.append(base)
+            by_base.setdefault(base, {})
+            by_base[base][plat] = rate
+            if plat == "Lighter" and base not in bases_lighter:
+                bases_lighter.append(base)
 
     if not by_base and agg_debug:
         print("⚠ agregador vacío; plataformas vistas:", dict(seen_platforms))
         if debug_samples:
-            import json as _json
             print("\nEjemplos de nodos candidatos del agregador:")
-            for node, path in debug_samples:
+            for node, plat_hint in debug_samples:
                 slim = {k: node[k] for k in list(node)[:8]}
-                print(f"- path={'/'.join(path)} :: {_json.dumps(slim, ensure_ascii=False)[:300]} ...")
+                print(f"- plat_hint={plat_hint} :: {orjson.dumps(slim).decode()[:300]} ...")
 
     return by_base, bases_lighter
 
 # ---------------- Paradex ----------------
+TS_KEYS = ("timestamp", "time", "ts", "created_at", "updated_at")
+
 def _parse_ts(ts_val: Any) -> Optional[float]:
     if ts_val is None: return None
     if isinstance(ts_val, (int, float)):
         x = float(ts_val)
         return x/1000.0 if x > 1e12 else x
     if isinstance(ts_val, str):
-        s = ts_val.strip()
         try:
-            if s.endswith("Z"): s = s[:-1] + "+00:00"
-            return datetime.fromisoformat(s).timestamp()
+            return ciso8601.parse_datetime(ts_val.strip()).timestamp()
         except Exception:
             return None
     return None
@@ -212,7 +238,8 @@ def extract_paradex_latest(payload: Any) -> Optional[float]:
         items = payload.get("data") or payload.get("results") or payload.get("items")
     if not isinstance(items, list) or not items:
         return None
-    best_rate, best_ts = None, -1.0
+    rates: List[float] = []
+    stamps: List[float] = []
     for it in items:
         if not isinstance(it, dict): continue
         rate_raw = it.get("funding_rate") or it.get("fundingRate") or it.get("hourly_funding_rate")
@@ -221,26 +248,131 @@ def extract_paradex_latest(payload: Any) -> Optional[float]:
         except Exception:
             rate = None
         if rate is None: continue
-        ts = (_parse_ts(it.get("timestamp")) or _parse_ts(it.get("time")) or
-              _parse_ts(it.get("ts")) or _parse_ts(it.get("created_at")) or
-              _parse_ts(it.get("updated_at")))
-        if ts is None: ts = best_ts + 1.0
-        if ts > best_ts:
-            best_ts, best_rate = ts, rate
-    return best_rate
-
-def fetch_paradex_latest_for_base(base: str, quotes: List[str], client: httpx.Client, verbose: bool=False) -> Optional[float]:
+        ts = None
+        for key in TS_KEYS:  # sólo la primera clave presente
+            if it.get(key) is not None:
+                ts = _parse_ts(it[key])
+                break
+        rates.append(rate)
+        stamps.append(math.nan if ts is None else ts)
+    if not rates:
+        return None
+    ts_arr = np.asarray(stamps, dtype=np.float64)
+    ts_arr = np.where(np.isnan(ts_arr), -np.inf, ts_arr)
+    if not np.isfinite(ts_arr).any():
+        return rates[-1]  # sin timestamps: el último de la lista es el más reciente
+    return rates[int(np.argmax(ts_arr))]
+
+class TokenBucket:
+    """
+    Ritmo compartido por todas las peticiones a Paradex: `rps` tokens/s, ráfaga de hasta `rps`.
+    AIMD: un 429 divide el ritmo entre 2 (como mucho una vez cada `window` s) y cada
+    respuesta buena suma `rps / 8` req/s hasta volver al `rps` configurado.
+    """
+
+    def __init__(self, rps: float, min_rps: float=0.5, window: float=5.0) -> None:
+        self.rps = rps
+        self.max_rps = rps
+        self.min_rps = min(min_rps, rps)
+        self.increase = rps / 8.0
+        self.window = window
+        self.capacity = max(1.0, rps)
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+        self._hold_from = float("-inf")
+        self._hold_until = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rps)
+                self._last = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rps)
+
+    def backoff(self, sent_at: float, cooldown: float=0.0) -> bool:
+        """
+        Tras un 429 divide el ritmo entre 2 y vacía la ráfaga, una sola vez por episodio:
+        no vuelven a recortar ni los 429 de peticiones enviadas antes del último recorte
+        (las que ya estaban en vuelo) ni los que lleguen durante los max(`window`, `cooldown`)
+        s siguientes (`cooldown` = Retry-After). Devuelve si se aplicó.
+        """
+        now = time.monotonic()
+        if sent_at < self._hold_from or now < self._hold_until:
+            return False
+        self.rps = max(self.min_rps, self.rps / 2.0)
+        self.tokens = 0.0
+        self._hold_from = now
+        self._hold_until = now + max(self.window, cooldown)
+        return True
+
+    def on_success(self) -> None:
+        self.rps = min(self.max_rps, self.rps + self.increase)
+
+RETRY_AFTER_MAX_S = 30.0
+
+def _retry_after_s(r: httpx.Response, default: float=1.0) -> float:
+    """Espera pedida por un 429: Retry-After en segundos o como fecha HTTP (acotada)."""
+    raw = (r.headers.get("Retry-After") or "").strip()
+    if not raw:
+        return default
+    try:
+        wait = float(raw)
+    except ValueError:
+        try:
+            wait = parsedate_to_datetime(raw).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return default
+    return min(max(wait, 0.0), RETRY_AFTER_MAX_S)
+
+async def fetch_paradex_latest_for_base(base: str, quotes: List[str], client: httpx.AsyncClient, verbose: bool=False,
+                                        cache_ttl: float=0.0, bucket: Optional[TokenBucket]=None) -> Optional[float]:
     for q in quotes:
         mkt = f"{base}-{q}-PERP"
         url = PARADEX_URL.format(market=mkt)
         try:
-            r = client.get(url, timeout=12)
-            if verbose:
-                print(f"[Paradex] GET {url} -> {r.status_code}")
-            if r.status_code == 404:
-                continue
-            r.raise_for_status()
-            rate = extract_paradex_latest(r.json())
+            content = cache_read(f"paradex-{mkt}", cache_ttl)
+            if content is not None:
+                if verbose:
+                    print(f"[Paradex] {mkt} desde caché")
+            else:
+                for attempt in range(2):  # un único reintento tras 429
+                    if bucket:
+                        await bucket.acquire()
+                    sent_at = time.monotonic()
+                    r = await client.get(url, timeout=12)
+                    if verbose:
+                        print(f"[Paradex] GET {url} -> {r.status_code}")
+                    if r.status_code != 429:
+                        if bucket and r.status_code < 400:
+                            bucket.on_success()
+                        break
+                    if attempt:
+                        break
+                    # un solo recorte por evento 429 (el del reintento no vuelve a recortar)
+                    wait = _retry_after_s(r)
+                    if bucket:
+                        bucket.backoff(sent_at, cooldown=wait)
+                    if verbose:
+                        rps = f", ritmo {bucket.rps:.2f} req/s" if bucket else ""
+                        print(f"[Paradex] {mkt} 429: reintento en {wait:.1f}s{rps}")
+                    await asyncio.sleep(wait)
+                if r.status_code == 429:
+                    # el mercado puede existir: no se prueba la siguiente quote (daría un falso 404)
+                    if verbose:
+                        print(f"[Paradex] {mkt} rate-limited (429 tras reintentar); {base} queda sin dato")
+                    return None
+                if r.status_code == 404:
+                    continue
+                r.raise_for_status()
+                content = r.content
+                if cache_ttl > 0:
+                    cache_write(f"paradex-{mkt}", content)
+            rate = extract_paradex_latest(orjson.loads(content))
             if rate is not None:
                 if verbose:
                     print(f"[Paradex] {mkt} latest funding_rate={rate:.8f}")
@@ -253,44 +385,73 @@ def fetch_paradex_latest_for_base(base: str, quotes: List[str], client: httpx.Cl
         print(f"[Paradex] {base}: sin mercado válido (quotes probadas: {quotes})")
     return None
 
+async def fetch_paradex_all(bases: List[str], quotes: List[str], client: httpx.AsyncClient, concurrency: int=10,
+                            rps: float=8.0, verbose: bool=False, cache_ttl: float=0.0) -> Dict[str, Optional[float]]:
+    """Consulta Paradex en paralelo; el semáforo acota las peticiones en vuelo y el
+    token bucket su ritmo (rps<=0 lo desactiva)."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+    bucket = TokenBucket(rps) if rps > 0 else None
+
+    async def bounded(base: str) -> Optional[float]:
+        async with sem:
+            return await fetch_paradex_latest_for_base(base, quotes, client, verbose=verbose,
+                                                       cache_ttl=cache_ttl, bucket=bucket)
+
+    rates = await asyncio.gather(*[bounded(base) for base in bases])
+    return dict(zip(bases, rates))
+
 # ---------------- render ----------------
 def print_pivot(by_base: Dict[str, Dict[str, Optional[float]]]) -> None:
     bases = sorted(by_base.keys())
     headers = ["Activo", "Hyperliquid/hr", "Lighter/hr", "Paradex/hr"]
-    col1 = max(len(headers[0]), *(len(b) for b in bases)) if bases else len(headers[0])
-    col2 = max(len(headers[1]), *(len(pct(by_base[b].get("Hyperliquid"))) for b in bases)) if bases else len(headers[1])
-    col3 = max(len(headers[2]), *(len(pct(by_base[b].get("Lighter"))) for b in bases)) if bases else len(headers[2])
-    col4 = max(len(headers[3]), *(len(pct(by_base[b].get("Paradex"))) for b in bases)) if bases else len(headers[3])
+    # una sola pasada: formatea cada fila una vez y va ajustando los anchos
+    rows: List[Tuple[str, str, str, str]] = []
+    widths = [len(h) for h in headers]
+    for b in bases:
+        row = by_base[b]
+        cells = (b, pct(row.get("Hyperliquid")), pct(row.get("Lighter")), pct(row.get("Paradex")))
+        rows.append(cells)
+        for i, cell in enumerate(cells):
+            if len(cell) > widths[i]:
+                widths[i] = len(cell)
 
     def pad(s,w): return s + " "*(w-len(s))
-    line = "-"*(col1+col2+col3+col4+10)
+    def render(cells): return "| " + " | ".join(pad(c, w) for c, w in zip(cells, widths)) + " |"
+    line = "-"*(sum(widths)+10)
 
     print(line)
-    print(f"| {pad(headers[0], col1)} | {pad(headers[1], col2)} | {pad(headers[2], col3)} | {pad(headers[3], col4)} |")
+    print(render(headers))
     print(line)
-    for b in bases:
-        row = by_base[b]
-        print(f"| {pad(b, col1)} | {pad(pct(row.get('Hyperliquid')), col2)} | {pad(pct(row.get('Lighter')), col3)} | {pad(pct(row.get('Paradex')), col4)} |")
+    for cells in rows:
+        print(render(cells))
     print(line)
     print(f"{len(bases)} tokens • {datetime.now(timezone.utc).isoformat(timespec='seconds')}")
 
 # ---------------- main ----------------
-def parse_args():
+def parse_args(argv: Optional[List[str]]=None):
     ap = argparse.ArgumentParser(description="Funding actual: Hyperliquid + Lighter + Paradex (bases sacadas de Lighter)")
     ap.add_argument("--only-bases", type=str, default="", help="Limitar a estas bases (coma): 'BTC,ETH,SOL'")
     ap.add_argument("--limit", type=int, default=0, help="Limitar número de tokens (útil para tests)")
     ap.add_argument("--quotes", type=str, default="USD,USDC", help="Quotes a probar en Paradex: 'USD,USDC,USDT'")
-    ap.add_argument("--sleep-ms", type=int, default=250, help="Pausa entre llamadas a Paradex (ms)")
+    ap.add_argument("--rps", type=float, default=8.0, help="Ritmo máximo hacia Paradex (req/s; se reduce solo ante 429; 0 = sin límite)")
+    ap.add_argument("--concurrency", type=int, default=10, help="Peticiones simultáneas a Paradex")
     ap.add_argument("--paradex-verbose", action="store_true", help="Logs detallados de Paradex")
     ap.add_argument("--agg-debug", action="store_true", help="Depurar parseo del agregador si no aparecen HL/Lighter")
-    return ap.parse_args()
+    ap.add_argument("--cache-ttl", type=float, default=CACHE_TTL_S, help=f"Validez de la caché en {CACHE_DIR} (s)")
+    ap.add_argument("--no-cache", action="store_true", help="Ignorar la caché en disco y descargar todo")
+    return ap.parse_args(argv)
 
-def main() -> int:
-    args = parse_args()
+async def run(args: argparse.Namespace) -> int:
+    """Para llamadores con su propio event loop: usa (y cierra) un cliente propio."""
+    async with make_client() as client:
+        return await _run(args, client)
+
+async def _run(args: argparse.Namespace, client: httpx.AsyncClient) -> int:
+    cache_ttl = 0.0 if args.no_cache else args.cache_ttl
 
     # 1) HL + Lighter (parser robusto)
     try:
-        by_base, bases_lighter = fetch_agg(agg_debug=args.agg_debug)
+        by_base, bases_lighter = await fetch_agg(client, agg_debug=args.agg_debug, cache_ttl=cache_ttl)
     except Exception as e:
         print(f"Error leyendo agregador: {e}", file=sys.stderr)
         return 1
@@ -308,14 +469,12 @@ def main() -> int:
 
     # 2) Paradex para esas bases
     quotes = [q.strip().upper() for q in args.quotes.split(",") if q.strip()]
-    sleep_s = max(0, args.sleep_ms)/1000.0
-    with httpx.Client(timeout=12, headers={"User-Agent": "funding-triplet/1.1"}) as client:
-        for base in bases:
-            rate = fetch_paradex_latest_for_base(base, quotes, client, verbose=args.paradex_verbose)
-            by_base.setdefault(base, {})
-            if rate is not None:
-                by_base[base]["Paradex"] = rate
-            if sleep_s: time.sleep(sleep_s)
+    paradex = await fetch_paradex_all(bases, quotes, client, concurrency=args.concurrency,
+                                      rps=args.rps, verbose=args.paradex_verbose, cache_ttl=cache_ttl)
+    for base, rate in paradex.items():
+        by_base.setdefault(base, {})
+        if rate is not None:
+            by_base[base]["Paradex"] = rate
 
     # 3) Mostrar pivote
     if by_base:
@@ -324,5 +483,8 @@ def main() -> int:
         print("Sin datos que mostrar.")
     return 0
 
+def main(argv: Optional[List[str]]=None) -> int:
+    return _get_loop().run_until_complete(_run(parse_args(argv), get_client()))
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Núcleo del parser del agregador (sin E/S): normalización, clasificación de
+claves, recorrido del árbol y extracción de (platform, base, rate).
+
+Va en un módulo aparte para poder compilarlo con mypyc (`mypyc funding_core.py`);
+funding.py importa lo mismo tanto si está compilado como si no.
+"""
+
+import re
+import functools
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# ---------------- util comunes ----------------
+_NON_ALNUM = re.compile(r"[\W_]+")  # equivale a "no isalnum()" también en Unicode
+
+def clean_alnum(s: str) -> str:
+    return _NON_ALNUM.sub("", s).lower()
+
+def coerce_rate(val: Any) -> Optional[float]:
+    """Normaliza a fracción por hora. Si viene en % (1..100) => /100. Descarta >50%/h."""
+    if val is None:
+        return None
+    try:
+        x = float(val)
+    except Exception:
+        return None
+    if 1.0 < abs(x) <= 100.0:
+        x /= 100.0
+    if abs(x) > 0.5:
+        return None
+    return x
+
+@functools.lru_cache(maxsize=4096)
+def base_from_symbol(symbol: str) -> str:
+    s = (symbol or "").upper().replace("/", "-").replace("__", "-").strip()
+    parts = [p for p in s.split("-") if p]
+    return parts[0] if parts else (s or "?")
+
+# ---------------- agregador (parser robusto) ----------------
+PLAT_MAP: Dict[str, str] = {
+    "lighter": "Lighter",
+    "zklighter": "Lighter",
+    "hyperliquid": "Hyperliquid",
+    "hyperliquidv2": "Hyperliquid",
+    "hyper": "Hyperliquid",
+}
+# alternación con las claves más largas primero ("hyperliquidv2" antes que "hyper")
+_PLAT_KEYS_SORTED = sorted(PLAT_MAP, key=len, reverse=True)
+_PLAT_RE = re.compile("|".join(map(re.escape, _PLAT_KEYS_SORTED)))
+PLATFORM_KEYS = ("platform", "exchange", "venue", "source", "provider", "dex", "market_provider")
+SYMBOL_KEYS = ("symbol", "market", "pair", "name", "base", "asset", "coin", "ticker")
+FUND_KEYS = ("funding_rate", "fundingrate", "hourlyfundingrate", "predictedfundingrate", "rate", "value")
+
+@functools.lru_cache(maxsize=4096)
+def norm_platform_label(raw: Optional[str]) -> Optional[str]:
+    if not raw:
+        return None
+    key = clean_alnum(raw)
+    if key in PLAT_MAP:
+        return PLAT_MAP[key]
+    m = _PLAT_RE.search(key)
+    return PLAT_MAP[m.group(0)] if m else None
+
+# coincidencias exactas (caso común) antes de caer al escaneo por subcadena
+_SYMBOL_KEYSET = frozenset(SYMBOL_KEYS)
+_PLATFORM_KEYSET = frozenset(PLATFORM_KEYS)
+_FUND_KEYSET = frozenset(FUND_KEYS)
+# una alternación compilada por categoría: un único escaneo en C por clave
+_SYMBOL_RE = re.compile("|".join(map(re.escape, SYMBOL_KEYS)))
+_PLATFORM_RE = re.compile("|".join(map(re.escape, PLATFORM_KEYS)))
+_FUND_RE = re.compile("|".join(map(re.escape, FUND_KEYS)))
+
+# los clasificadores reciben la clave ya en minúsculas (se baja una vez por clave)
+def is_probable_symbol_key(k_low: str) -> bool:
+    return k_low in _SYMBOL_KEYSET or _SYMBOL_RE.search(k_low) is not None
+
+def is_probable_platform_key(k_low: str) -> bool:
+    return k_low in _PLATFORM_KEYSET or _PLATFORM_RE.search(k_low) is not None
+
+def is_probable_rate_key(k_low: str) -> bool:
+    if k_low in _FUND_KEYSET:
+        return True
+    return _FUND_RE.search(k_low) is not None or ("fund" in k_low and "index" not in k_low and "time" not in k_low)
+
+MAX_DEPTH = 8  # el agregador de Lighter es poco profundo; corta payloads inesperados
+
+def traverse(root: Any) -> Iterable[Tuple[Dict[str, Any], Optional[str]]]:
+    """Recorre el árbol con una pila explícita (preorden) y entrega cada dict junto
+    con la plataforma del ancestro más cercano cuya clave la nombra (p.ej. "Hyperliquid").
+    Sólo desciende por contenedores y hasta MAX_DEPTH; clasificar claves es cosa de extract_record."""
+    stack: List[Tuple[Any, Optional[str], int]] = [(root, None, 0)]
+    while stack:
+        node, plat_hint, depth = stack.pop()
+        children: List[Tuple[Any, Optional[str], int]] = []
+        if isinstance(node, dict):
+            yield node, plat_hint
+            if depth < MAX_DEPTH:
+                children = [(v, norm_platform_label(k) or plat_hint, depth + 1)
+                            for k, v in node.items() if isinstance(v, (dict, list))]
+        elif isinstance(node, list) and depth < MAX_DEPTH:
+            children = [(v, plat_hint, depth + 1) for v in node if isinstance(v, (dict, list))]
+        stack.extend(reversed(children))
+
+def extract_record(d: Dict[str, Any], plat_hint: Optional[str]) -> Tuple[Optional[str], Optional[str], Optional[float]]:
+    """(platform, base, rate) desde cualquier sub-dict del agregador."""
+    platform: Optional[str] = None
+    symbol: Optional[str] = None
+    rate: Optional[float] = None
+    nested: List[Dict[str, Any]] = []
+
+    # 1) directos (una sola pasada; los sub-dicts se guardan por si hacen falta)
+    for k, v in d.items():
+        if isinstance(v, dict):
+            nested.append(v)
+            continue
+        if not isinstance(v, (int, float, str)):
+            continue
+        k_low = k.lower()
+        if isinstance(v, str):
+            if not platform and is_probable_platform_key(k_low):
+                platform = norm_platform_label(v)
+            if not symbol and is_probable_symbol_key(k_low):
+                symbol = v
+        if rate is None and is_probable_rate_key(k_low):
+            rate = coerce_rate(v)
+
+    # 2) plataforma por ruta (p.ej. claves superiores "Hyperliquid" / "Lighter")
+    platform = platform or plat_hint
+
+    # 3) símbolo / rate anidados en sub-dicts directos; por sub-dict sólo cuenta la
+    #    primera clave de símbolo (aunque venga vacía, como hacía el parser original)
+    for v in nested:
+        if symbol and rate is not None:
+            break
+        want_symbol = not symbol
+        for kk, vv in v.items():
+            if not isinstance(vv, (int, float, str)):
+                continue
+            kk_low = kk.lower()
+            if want_symbol and isinstance(vv, str) and is_probable_symbol_key(kk_low):
+                symbol = vv
+                want_symbol = False
+            if rate is None and is_probable_rate_key(kk_low):
+                rate = coerce_rate(vv)
+
+    base = base_from_symbol(symbol or "")
+    return platform, base if symbol else None, rate